@@ -2,10 +2,24 @@ import streamlit as st
 import pandas as pd
 import json
 import io
+import csv
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
 from src.agent import ExecutionDisciplineAgent
-from src.coaching import generate_coaching_summary
+from src.coaching import create_openai_client, generate_coaching_summary
+from src.schemas import Violation
 
 def get_regime_from_market_regime_agent() -> str:
     """
@@ -22,8 +36,11 @@ def get_regime_from_market_regime_agent() -> str:
             return default_regime
         
         # Read and parse JSON
-        with open(regime_agent_path, 'r') as f:
-            regime_data = json.load(f)
+        if orjson is not None:
+            regime_data = orjson.loads(regime_agent_path.read_bytes())
+        else:
+            with open(regime_agent_path, 'r') as f:
+                regime_data = json.load(f)
         
         # Extract last_regime_label
         last_regime = regime_data.get("last_regime_label")
@@ -42,18 +59,95 @@ def violations_to_csv(violations) -> str:
     Convert violations list to CSV format.
     Returns CSV string with columns: trade_index, violation_type, detail
     """
-    if not violations:
-        return "trade_index,violation_type,detail\n"
-    
-    # Create CSV content
-    csv_lines = ["trade_index,violation_type,detail"]
-    for v in violations:
-        # Escape quotes in CSV fields (double quotes for CSV standard)
-        violation_type_escaped = v.violation_type.replace('"', '""')
-        detail_escaped = v.detail.replace('"', '""')
-        csv_lines.append(f'{v.trade_index},"{violation_type_escaped}","{detail_escaped}"')
-    
-    return "\n".join(csv_lines)
+    # csv.writer handles quoting of commas, quotes and newlines in fields
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(["trade_index", "violation_type", "detail"])
+    writer.writerows((v.trade_index, v.violation_type, v.detail) for v in violations)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False)
+def _parse_trades(raw: bytes) -> pd.DataFrame:
+    """
+    Parse uploaded trades CSV bytes.
+    Cached on the raw bytes so widget reruns with the same upload skip parsing.
+    Uses PyArrow's multithreaded CSV reader when installed, else pandas.
+    PyArrow rejects ragged rows (e.g. a trailing empty stop_price left off),
+    so those uploads fall back to pandas, which reads the missing fields as NaN.
+    """
+    if pacsv is not None:
+        try:
+            table = pacsv.read_csv(io.BytesIO(raw), read_options=pacsv.ReadOptions(use_threads=True))
+        except pa.ArrowInvalid:
+            return pd.read_csv(io.BytesIO(raw))
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    return pd.read_csv(io.BytesIO(raw))
+
+@st.cache_data(show_spinner=False)
+def _parse_plan(raw: bytes) -> dict:
+    """
+    Parse uploaded trading plan JSON bytes (cached on content).
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+@st.cache_resource(show_spinner=False)
+def _get_agent():
+    """
+    Single agent per process, so memory is loaded once rather than on every rerun.
+    """
+    return ExecutionDisciplineAgent()
+
+@st.cache_data(show_spinner=False)
+def _run_agent(trades_bytes: bytes, plan_bytes: bytes, regime: str):
+    """
+    Evaluate the uploaded files against the regime, memoized on their content.
+    History is not written here; the caller records each run via agent.record().
+    """
+    return _get_agent().evaluate(_parse_trades(trades_bytes), _parse_plan(plan_bytes), regime)
+
+@st.cache_resource(show_spinner=False)
+def _get_openai_client():
+    """
+    Shared OpenAI client, so its HTTP connection pool is reused across reruns.
+    """
+    return create_openai_client()
+
+class _CoachingUnavailable(Exception):
+    """Raised inside the cached coaching call so failures are not memoized."""
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_coaching_summary(summary_items: tuple, compliance_score: float, top_violations: tuple) -> str:
+    """
+    Coaching summary memoized on the inputs the prompt is built from.
+    """
+    violations = [
+        Violation(trade_index=i, violation_type=violation_type, detail=detail)
+        for i, (violation_type, detail) in enumerate(top_violations)
+    ]
+    summary = generate_coaching_summary(
+        violations,
+        dict(summary_items),
+        compliance_score,
+        client=_get_openai_client()
+    )
+    if summary is None:
+        raise _CoachingUnavailable()
+    return summary
+
+def get_coaching_summary(report):
+    """
+    Return the (cached) coaching summary for a report, or None if LLM coaching is unavailable.
+    """
+    try:
+        return _cached_coaching_summary(
+            tuple(sorted(report.violation_summary.items())),
+            round(report.compliance_score, 2),
+            tuple((v.violation_type, v.detail) for v in report.violations[:10])
+        )
+    except _CoachingUnavailable:
+        return None
 
 # MUST be the first Streamlit call
 st.set_page_config(page_title="Execution Discipline Agent", layout="wide")
@@ -93,13 +187,9 @@ enable_coaching = st.checkbox(
 # --- Run agent ---
 if trades_file is not None and plan_file is not None:
     try:
-        # Reset file pointers to beginning
-        trades_file.seek(0)
-        plan_file.seek(0)
-        
-        # Read CSV file
+        # Read CSV file (getvalue() returns the full upload regardless of file pointer)
         try:
-            trades = pd.read_csv(trades_file)
+            trades = _parse_trades(trades_file.getvalue())
             st.success(f"✅ Loaded {len(trades)} trades from CSV")
         except Exception as csv_error:
             st.error(f"❌ Error reading CSV file: {str(csv_error)}")
@@ -108,7 +198,7 @@ if trades_file is not None and plan_file is not None:
         
         # Read JSON file
         try:
-            plan = json.load(plan_file)
+            plan = _parse_plan(plan_file.getvalue())
             st.success("✅ Loaded trading plan JSON")
         except json.JSONDecodeError as json_error:
             st.error(f"❌ Invalid JSON format: {str(json_error)}")
@@ -124,9 +214,11 @@ if trades_file is not None and plan_file is not None:
             st.error("❌ Trading plan missing required field: 'allowed_regimes'")
             st.stop()
 
-        # Run agent
-        agent = ExecutionDisciplineAgent()
-        report = agent.run(trades, plan, regime_label)
+        # Run agent (rule checks are cached; history is still recorded every run)
+        agent = _get_agent()
+        report = agent.record(
+            _run_agent(trades_file.getvalue(), plan_file.getvalue(), regime_label)
+        )
 
         st.subheader("📊 Discipline Report")
         st.metric("Compliance Score", report.compliance_score)
@@ -158,11 +250,7 @@ if trades_file is not None and plan_file is not None:
         # Optional LLM coaching summary
         if enable_coaching:
             with st.spinner("Generating coaching insights..."):
-                coaching_summary = generate_coaching_summary(
-                    report.violations,
-                    report.violation_summary,
-                    report.compliance_score
-                )
+                coaching_summary = get_coaching_summary(report)
             
             if coaching_summary:
                 st.subheader("💡 Behavioral Coaching")
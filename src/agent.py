@@ -1,30 +1,92 @@
+import sys
+import numpy as np
 import pandas as pd
-from typing import Dict
-from .schemas import DisciplineReport, Violation
-from .rules import check_regime_allowed, check_missing_stops, check_oversized_for_regime, check_r_multiple
-from .memory import load_memory, save_memory
+from collections import Counter, deque
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Optional
+from .schemas import DisciplineReport, Violation, to_dict
+from .rules import check_all
+from .memory import load_memory, save_memory, append_history, load_recent_history
+
+# Number of most recent runs used for the compliance trend
+RECENT_SCORES_WINDOW = 5
 
 
 class ExecutionDisciplineAgent:
-    def __init__(self, memory_path="state/memory.json"):
+    def __init__(self, memory_path="state/memory.json", history_path: Optional[str] = None):
         self.memory_path = memory_path
-        self.memory = load_memory(memory_path)
+        # Run history lives in an append-only log next to the memory file
+        self.history_path = history_path or str(Path(memory_path).with_name("history.ndjson"))
+        self.refresh_memory()
+
+    def refresh_memory(self):
+        """
+        Reload memory and the recent score window from disk, e.g. after another process wrote to them.
+        """
+        self.memory = load_memory(self.memory_path)
+        self._migrate_legacy_history()
+        self.recent_scores = self._load_recent_scores()
+        self._disk_state = self._stat_state_files()
+
+    def _stat_state_files(self) -> tuple:
+        """
+        (mtime_ns, size) of the memory file and history log; None for a missing file.
+        """
+        stamps = []
+        for path in (self.memory_path, self.history_path):
+            p = Path(path)
+            if p.exists():
+                st = p.stat()
+                stamps.append((st.st_mtime_ns, st.st_size))
+            else:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _migrate_legacy_history(self):
+        """
+        Move history stored inside memory.json by older versions into the history log.
+        Only a missing or empty log is seeded: if the log already has runs, a legacy
+        file restored later (e.g. from git) would otherwise land after the recent runs.
+        In that case the legacy list is left in memory.json untouched rather than dropped.
+        """
+        legacy_history = self.memory.get("history")
+        if legacy_history is None:
+            return
+        log = Path(self.history_path)
+        if log.exists() and log.stat().st_size > 0:
+            return
+        for entry in legacy_history:
+            append_history(self.history_path, entry)
+        del self.memory["history"]
+        save_memory(self.memory_path, self.memory)
+
+    def _load_recent_scores(self) -> deque:
+        """
+        Bounded window of the last 5 compliance scores, seeded from the history log if memory has none.
+        """
+        # The log is the source of truth: once it is deleted, stored scores are stale
+        log = Path(self.history_path)
+        if not log.exists() or log.stat().st_size == 0:
+            return deque(maxlen=RECENT_SCORES_WINDOW)
+
+        scores = self.memory.get("recent_scores")
+        if scores is None:
+            scores = [
+                entry.get("compliance_score", 0.0)
+                for entry in load_recent_history(self.history_path, n=RECENT_SCORES_WINDOW)
+            ]
+        return deque(scores, maxlen=RECENT_SCORES_WINDOW)
     
     def _calculate_compliance_trend(self) -> str:
         """
         Calculate compliance trend over the last 5 runs.
         Returns: 'improving', 'worsening', or 'flat'
         """
-        history = self.memory.get("history", [])
-        
-        if len(history) < 2:
-            return "flat"  # Not enough data
-        
-        # Get last 5 compliance scores (or all if less than 5)
-        scores = [entry.get("compliance_score", 0.0) for entry in history[-5:]]
+        scores = np.fromiter(self.recent_scores, dtype=np.float64, count=len(self.recent_scores))
         
         if len(scores) < 2:
-            return "flat"
+            return "flat"  # Not enough data
         
         # Simple trend: compare average of first half vs second half
         # For 5 scores: compare first 2 vs last 3
@@ -40,8 +102,8 @@ class ExecutionDisciplineAgent:
             first_half = scores[:1]
             second_half = scores[-1:]
         
-        avg_first = sum(first_half) / len(first_half)
-        avg_second = sum(second_half) / len(second_half)
+        avg_first = first_half.mean()
+        avg_second = second_half.mean()
         
         # Determine trend with a small threshold to avoid noise
         threshold = 0.02  # 2% change threshold
@@ -59,64 +121,66 @@ class ExecutionDisciplineAgent:
         plan: Dict,
         regime_label: str
     ) -> DisciplineReport:
+        return self.record(self.evaluate(trades, plan, regime_label))
 
-        violations = []
-
-        # Regime check
-        violations += check_regime_allowed(
-            trades,
-            plan["allowed_regimes"],
-            regime_label
-        )
+    def evaluate(
+        self,
+        trades: pd.DataFrame,
+        plan: Dict,
+        regime_label: str
+    ) -> DisciplineReport:
+        """
+        Run the rule checks without touching history, so the result can be memoized.
+        The returned report has compliance_trend=None until record() fills it in.
+        """
 
-        # Stop compliance
-        if plan.get("stop_required", False):
-            violations += check_missing_stops(trades)
-
-        # Regime-aware sizing compliance
-        account_size = float(plan.get("account_size", 0) or 0)
-        position_limits_by_regime = plan.get("position_limits_by_regime", {}) or {}
-        violations += check_oversized_for_regime(
-            trades,
-            account_size=account_size,
-            position_limits_by_regime=position_limits_by_regime,
-            current_regime=regime_label
-        )
+        # Interned label so the limit and summary lookups compare by identity
+        regime_label = sys.intern(regime_label)
 
-        # R-multiple check (Early Exit, Late Exit)
-        violations += check_r_multiple(trades)
+        # All enabled checks in one pass over the trade columns
+        violations = check_all(trades, plan, regime_label)
 
         compliance_score = 1.0 - (len(violations) / max(len(trades), 1))
         compliance_score = max(0.0, round(compliance_score, 2))
 
+        # Aggregate violations by violation_type in a single pass
+        violation_summary = dict(Counter(v.violation_type for v in violations))
+
         regime_mismatch_rate = (
-            len([v for v in violations if v.violation_type == "Regime Mismatch"])
+            violation_summary.get("Regime Mismatch", 0)
             / max(len(trades), 1)
         )
 
-        # Aggregate violations by violation_type
-        violation_summary = {}
-        for violation in violations:
-            violation_type = violation.violation_type
-            violation_summary[violation_type] = violation_summary.get(violation_type, 0) + 1
-
-        # Save current run to memory before calculating trend
-        self.memory["history"].append({
-            "compliance_score": compliance_score,
-            "violations": [v.__dict__ for v in violations],
-            "violation_summary": violation_summary
-        })
-        save_memory(self.memory_path, self.memory)
-
-        # Calculate compliance trend (includes current run)
-        compliance_trend = self._calculate_compliance_trend()
-
         report = DisciplineReport(
             compliance_score=compliance_score,
             violations=violations,
             regime_mismatch_rate=round(regime_mismatch_rate, 2),
-            violation_summary=violation_summary,
-            compliance_trend=compliance_trend
+            violation_summary=violation_summary
         )
 
         return report
+
+    def record(self, report: DisciplineReport) -> DisciplineReport:
+        """
+        Persist an evaluated report to history and return it with the updated compliance trend.
+        """
+        entry = {
+            "compliance_score": report.compliance_score,
+            "violations": [to_dict(v) for v in report.violations],
+            "violation_summary": report.violation_summary
+        }
+
+        # A long-lived agent (e.g. cached by the Streamlit app) re-syncs if the files
+        # were deleted or written by someone else since it last touched them
+        if self._stat_state_files() != self._disk_state:
+            self.refresh_memory()
+
+        # Save current run to history before calculating trend
+        append_history(self.history_path, entry)
+        self.recent_scores.append(report.compliance_score)
+        self.memory["recent_scores"] = list(self.recent_scores)
+        save_memory(self.memory_path, self.memory)
+        self._disk_state = self._stat_state_files()
+
+        # Calculate compliance trend (includes current run)
+        return replace(report, compliance_trend=self._calculate_compliance_trend())
@@ -2,14 +2,36 @@
 Optional LLM coaching module for behavioral insights.
 This module is optional and does not affect deterministic violation detection.
 """
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from .schemas import Violation
 
 
+def create_openai_client() -> Optional[Any]:
+    """
+    Create an OpenAI client for coaching calls.
+    
+    Returns:
+        OpenAI client, or None if the openai package or OPENAI_API_KEY is missing
+    """
+    try:
+        import openai
+    except ImportError:
+        return None
+    
+    # Check if OpenAI API key is set
+    import os
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    
+    return openai.OpenAI(api_key=api_key)
+
+
 def generate_coaching_summary(
     violations: List[Violation],
     violation_summary: Dict[str, int],
-    compliance_score: float
+    compliance_score: float,
+    client: Optional[Any] = None
 ) -> Optional[str]:
     """
     Generate a behavioral coaching summary using LLM.
@@ -18,19 +40,14 @@ def generate_coaching_summary(
         violations: List of violation objects
         violation_summary: Dictionary of violation types and counts
         compliance_score: Current compliance score (0.0-1.0)
+        client: Reusable OpenAI client; one is created per call if omitted
     
     Returns:
         Coaching summary string or None if LLM call fails
     """
-    try:
-        import openai
-    except ImportError:
-        return None
-    
-    # Check if OpenAI API key is set
-    import os
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if client is None:
+        client = create_openai_client()
+    if client is None:
         return None
     
     try:
@@ -47,8 +64,6 @@ def generate_coaching_summary(
             summary_text += f"- {v.violation_type}: {v.detail}\n"
         
         # Call OpenAI API
-        client = openai.OpenAI(api_key=api_key)
-        
         response = client.chat.completions.create(
             model="gpt-4o-mini",  # Use cost-effective model
             messages=[
@@ -1,17 +1,48 @@
 import json
+from collections import deque
 from pathlib import Path
 
-DEFAULT_STATE = {
-    "history": []
-}
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_STATE = {}
 
 def load_memory(path: str) -> dict:
     p = Path(path)
     if not p.exists():
         return DEFAULT_STATE.copy()
+    if orjson is not None:
+        return orjson.loads(p.read_bytes())
     return json.loads(p.read_text())
 
 def save_memory(path: str, state: dict):
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(json.dumps(state, indent=2))
+    if orjson is not None:
+        p.write_bytes(orjson.dumps(state, option=orjson.OPT_INDENT_2))
+    else:
+        p.write_text(json.dumps(state, indent=2))
+
+def append_history(path: str, entry: dict):
+    """Append one run to the NDJSON history log without rewriting earlier runs."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    if orjson is not None:
+        line = orjson.dumps(entry) + b"\n"
+    else:
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+    with open(p, "ab") as f:
+        f.write(line)
+
+def load_recent_history(path: str, n: int = 5) -> list:
+    """Return the last n runs from the NDJSON history log, oldest first."""
+    p = Path(path)
+    if not p.exists():
+        return []
+    # Read bytes: the log is always UTF-8, whatever the platform's locale encoding is
+    with open(p, "rb") as f:
+        lines = deque((line for line in f if line.strip()), maxlen=n)
+    loads = orjson.loads if orjson is not None else json.loads
+    return [loads(line) for line in lines]
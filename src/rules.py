@@ -1,36 +1,53 @@
+import sys
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import Collection, List, Dict
 from .schemas import Violation
 
+def _float_column(trades: pd.DataFrame, column: str) -> np.ndarray:
+    """Return a column as a float64 array, or all-NaN if the column is absent."""
+    if column not in trades.columns:
+        return np.full(len(trades), np.nan)
+    return trades[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _side_upper(trades: pd.DataFrame) -> np.ndarray:
+    """Return the upper-cased side column, treating missing sides as LONG."""
+    if "side" not in trades.columns:
+        return np.full(len(trades), "LONG")
+    return trades["side"].fillna("LONG").astype(str).str.upper().to_numpy()
+
 def check_regime_allowed(
     trades: pd.DataFrame,
-    allowed_regimes: List[str],
+    allowed_regimes: Collection[str],
     current_regime: str
 ) -> List[Violation]:
-    violations = []
-    if current_regime not in allowed_regimes:
-        for i in range(len(trades)):
-            violations.append(
-                Violation(
-                    trade_index=i,
-                    violation_type="Regime Mismatch",
-                    detail=f"Trade taken during {current_regime} regime"
-                )
-            )
-    return violations
+    if current_regime in allowed_regimes:
+        return []
+
+    # Every trade shares the same detail, so build the string once
+    detail = sys.intern(f"Trade taken during {current_regime} regime")
+    return [
+        Violation(
+            trade_index=i,
+            violation_type="Regime Mismatch",
+            detail=detail
+        )
+        for i in range(len(trades))
+    ]
 
 def check_missing_stops(trades: pd.DataFrame) -> List[Violation]:
-    violations = []
-    for i, row in trades.iterrows():
-        if pd.isna(row.get("stop_price")):
-            violations.append(
-                Violation(
-                    trade_index=i,
-                    violation_type="Missing Stop",
-                    detail="Stop required but not provided"
-                )
-            )
-    return violations
+    # A missing column reads as all-NaN, i.e. no trade has a stop
+    return _missing_stop_violations(np.isnan(_float_column(trades, "stop_price")), trades.index)
+
+def _missing_stop_violations(missing: np.ndarray, index: pd.Index) -> List[Violation]:
+    return [
+        Violation(
+            trade_index=i,
+            violation_type="Missing Stop",
+            detail="Stop required but not provided"
+        )
+        for i in index[np.flatnonzero(missing)].tolist()
+    ]
 
 def check_position_sizing(
     trades: pd.DataFrame,
@@ -45,36 +62,32 @@ def check_position_sizing(
     
     if position_limits is None or account_size is None:
         return violations
+
+    if not account_size or account_size <= 0:
+        return violations
     
     # Get the limit for the current regime
     regime_limit_pct = position_limits.get(current_regime)
     if regime_limit_pct is None:
         return violations
     
-    # Calculate position size and check against limit
-    for i, row in trades.iterrows():
-        shares = row.get("shares")
-        entry_price = row.get("entry_price")
-        
-        # Skip if required data is missing
-        if pd.isna(shares) or pd.isna(entry_price):
-            continue
-        
-        # Calculate position size
-        position_size = shares * entry_price
-        
-        # Calculate position as percentage of account
-        position_pct = (position_size / account_size) * 100
-        
-        # Check if exceeds regime limit
-        if position_pct > regime_limit_pct:
-            violations.append(
-                Violation(
-                    trade_index=i,
-                    violation_type="Oversized for Regime",
-                    detail=f"Position size {position_pct:.2f}% exceeds {regime_limit_pct}% limit for {current_regime} regime (position: ${position_size:,.2f})"
-                )
+    # Calculate position size for every trade at once; NaN rows never compare true
+    shares = _float_column(trades, "shares")
+    entry = _float_column(trades, "entry_price")
+    position_sizes = shares * entry
+    position_pcts = (position_sizes / account_size) * 100
+
+    # Check if exceeds regime limit; unpack flagged rows as plain Python tuples
+    bad = np.flatnonzero(position_pcts > regime_limit_pct)
+    rows = zip(trades.index[bad].tolist(), position_sizes[bad].tolist(), position_pcts[bad].tolist())
+    for i, position_size, position_pct in rows:
+        violations.append(
+            Violation(
+                trade_index=i,
+                violation_type="Oversized for Regime",
+                detail=f"Position size {position_pct:.2f}% exceeds {regime_limit_pct}% limit for {current_regime} regime (position: ${position_size:,.2f})"
             )
+        )
     
     return violations
 
@@ -83,6 +96,23 @@ def check_oversized_for_regime(
     account_size: float,
     position_limits_by_regime: dict,
     current_regime: str
+) -> List[Violation]:
+    return _oversized_violations(
+        _float_column(trades, "entry_price"),
+        _float_column(trades, "shares"),
+        trades.index,
+        account_size,
+        position_limits_by_regime,
+        current_regime
+    )
+
+def _oversized_violations(
+    entry: np.ndarray,
+    shares: np.ndarray,
+    index: pd.Index,
+    account_size: float,
+    position_limits_by_regime: dict,
+    current_regime: str
 ) -> List[Violation]:
     violations = []
 
@@ -106,25 +136,20 @@ def check_oversized_for_regime(
 
     max_value = (limit_pct / 100.0) * account_size
 
-    for i, row in trades.iterrows():
-        entry = row.get("entry_price")
-        shares = row.get("shares")
-
-        if pd.isna(entry) or pd.isna(shares):
-            continue
+    position_values = entry * shares
 
-        position_value = float(entry) * float(shares)
-        if position_value > max_value:
-            violations.append(
-                Violation(
-                    trade_index=i,
-                    violation_type="Oversized for Regime",
-                    detail=(
-                        f"Position value ${position_value:,.0f} exceeds "
-                        f"{limit_pct:.1f}% of account (${max_value:,.0f}) in regime '{current_regime}'."
-                    )
+    bad = np.flatnonzero((position_values > max_value) & ~np.isnan(position_values))
+    for i, position_value in zip(index[bad].tolist(), position_values[bad].tolist()):
+        violations.append(
+            Violation(
+                trade_index=i,
+                violation_type="Oversized for Regime",
+                detail=(
+                    f"Position value ${position_value:,.0f} exceeds "
+                    f"{limit_pct:.1f}% of account (${max_value:,.0f}) in regime '{current_regime}'."
                 )
             )
+        )
 
     return violations
 
@@ -138,61 +163,142 @@ def check_r_multiple(trades: pd.DataFrame) -> List[Violation]:
     - Early Exit: R < 0.5 (exited too early, didn't let trade run)
     - Late Exit: Trade hit stop after having >= 1R unrealized gain
     """
+    return _r_multiple_violations(
+        _float_column(trades, "entry_price"),
+        _float_column(trades, "exit_price"),
+        _float_column(trades, "stop_price"),
+        _side_upper(trades),
+        trades.index
+    )
+
+def _r_multiple_violations(
+    entry: np.ndarray,
+    exit_: np.ndarray,
+    stop: np.ndarray,
+    side_upper: np.ndarray,
+    index: pd.Index
+) -> List[Violation]:
     violations = []
     
-    for i, row in trades.iterrows():
-        entry_price = row.get("entry_price")
-        exit_price = row.get("exit_price")
-        stop_price = row.get("stop_price")
-        side = row.get("side", "LONG").upper()
-        
-        # Skip if required data is missing
-        if pd.isna(entry_price) or pd.isna(exit_price) or pd.isna(stop_price):
-            continue
-        
-        # Calculate R-multiple
-        # R = (exit_price - entry_price) / (entry_price - stop_price)
-        risk = entry_price - stop_price
-        
-        # Handle both LONG and SHORT positions
-        if side == "SHORT":
-            # For SHORT: entry > exit is profit, stop > entry is risk
-            risk = stop_price - entry_price
-            if abs(risk) < 0.0001:  # Avoid division by zero
-                continue
-            r_multiple = (entry_price - exit_price) / risk
-        else:
-            # For LONG: exit > entry is profit, entry > stop is risk
-            if abs(risk) < 0.0001:  # Avoid division by zero
-                continue
-            r_multiple = (exit_price - entry_price) / risk
-        
-        # Check for Early Exit: R < 0.5 (but not negative, which means stop was hit)
-        if 0 <= r_multiple < 0.5:
+    # Skip if required data is missing
+    valid = ~(np.isnan(entry) | np.isnan(exit_) | np.isnan(stop))
+    
+    # Handle both LONG and SHORT positions
+    # For LONG: exit > entry is profit, entry > stop is risk
+    # For SHORT: entry > exit is profit, stop > entry is risk
+    is_short = side_upper == "SHORT"
+    risk = np.where(is_short, stop - entry, entry - stop)
+    profit = np.where(is_short, entry - exit_, exit_ - entry)
+    valid &= np.abs(risk) >= 0.0001  # Avoid division by zero
+    r_multiple = np.divide(profit, risk, out=np.zeros_like(risk), where=valid)
+    
+    # Early Exit: R < 0.5 (but not negative, which means stop was hit)
+    early = valid & (r_multiple >= 0) & (r_multiple < 0.5)
+    
+    # Late Exit: Trade hit stop (exit_price == stop_price)
+    # This indicates the trade reversed from profit back to stop loss
+    # Note: Without peak price data, we flag all stop hits as potential late exits
+    # The assumption is that if a stop was hit, the trade likely had unrealized gains that were given back
+    hit_stop = np.abs(exit_ - stop) < 0.01  # Allow small floating point differences
+    late = valid & hit_stop & (np.abs(risk) > 0.01)  # Hit stop and risk was meaningful
+    
+    # Walk flagged rows together (as plain Python tuples) so violations stay ordered by trade
+    flagged = np.flatnonzero(early | late)
+    rows = zip(
+        index[flagged].tolist(),
+        entry[flagged].tolist(),
+        exit_[flagged].tolist(),
+        stop[flagged].tolist(),
+        r_multiple[flagged].tolist(),
+        early[flagged].tolist(),
+        late[flagged].tolist()
+    )
+    for i, entry_price, exit_price, stop_price, r, is_early, is_late in rows:
+        prices = f"Entry: ${entry_price:.2f}, Exit: ${exit_price:.2f}, Stop: ${stop_price:.2f}"
+        if is_early:
             violations.append(
                 Violation(
                     trade_index=i,
                     violation_type="Early Exit",
-                    detail=f"Exited at {r_multiple:.2f}R (less than 0.5R threshold). Entry: ${entry_price:.2f}, Exit: ${exit_price:.2f}, Stop: ${stop_price:.2f}"
+                    detail=f"Exited at {r:.2f}R (less than 0.5R threshold). {prices}"
                 )
             )
-        
-        # Check for Late Exit: Trade hit stop (exit_price == stop_price)
-        # This indicates the trade reversed from profit back to stop loss
-        # Note: Without peak price data, we flag all stop hits as potential late exits
-        # The assumption is that if a stop was hit, the trade likely had unrealized gains that were given back
-        hit_stop = abs(exit_price - stop_price) < 0.01  # Allow small floating point differences
-        
-        if hit_stop and abs(risk) > 0.01:  # Hit stop and risk was meaningful
-            # For Late Exit: We hit the stop, which suggests we should have exited earlier
-            # when the trade was profitable (>= 1R). Since we don't have peak price data,
-            # we flag all stop hits as potential late exits.
+        if is_late:
             violations.append(
                 Violation(
                     trade_index=i,
                     violation_type="Late Exit",
-                    detail=f"Hit stop loss at {r_multiple:.2f}R. Trade likely had >= 1R unrealized gain before reversing. Entry: ${entry_price:.2f}, Exit: ${exit_price:.2f}, Stop: ${stop_price:.2f}"
+                    detail=f"Hit stop loss at {r:.2f}R. Trade likely had >= 1R unrealized gain before reversing. {prices}"
                 )
             )
     
     return violations
+
+def check_all(
+    trades: pd.DataFrame,
+    plan: Dict,
+    current_regime: str
+) -> List[Violation]:
+    """
+    Run every check the plan enables, materializing each trade column once.
+    
+    The stop, sizing and R-multiple checks share the same NumPy arrays instead of
+    each re-reading the frame. Violations are returned in the same order as calling
+    check_regime_allowed, check_missing_stops, check_oversized_for_regime and
+    check_r_multiple one after another.
+    """
+    # Hash the regime list for O(1) lookups; any other shape (e.g. a single string)
+    # is passed through so `in` keeps its original meaning
+    allowed_regimes = plan["allowed_regimes"]
+    if isinstance(allowed_regimes, (list, tuple)) and all(isinstance(r, str) for r in allowed_regimes):
+        allowed_regimes = frozenset(allowed_regimes)
+
+    violations = check_regime_allowed(
+        trades,
+        allowed_regimes,
+        current_regime
+    )
+
+    # Decide once which checks can produce violations for this plan and frame
+    account_size = float(plan.get("account_size", 0) or 0)
+    position_limits_by_regime = plan.get("position_limits_by_regime", {}) or {}
+    needs_stops = bool(plan.get("stop_required", False))
+    needs_sizing = (
+        account_size > 0
+        and bool(position_limits_by_regime)
+        and {"entry_price", "shares"}.issubset(trades.columns)
+    )
+    has_rmult_cols = {"entry_price", "exit_price", "stop_price"}.issubset(trades.columns)
+
+    if not (needs_stops or needs_sizing or has_rmult_cols):
+        return violations
+
+    entry = _float_column(trades, "entry_price")
+    stop = _float_column(trades, "stop_price")
+
+    # Stop compliance (a missing stop_price column still counts as missing stops)
+    if needs_stops:
+        violations += _missing_stop_violations(np.isnan(stop), trades.index)
+
+    # Regime-aware sizing compliance
+    if needs_sizing:
+        violations += _oversized_violations(
+            entry,
+            _float_column(trades, "shares"),
+            trades.index,
+            account_size,
+            position_limits_by_regime,
+            current_regime
+        )
+
+    # R-multiple check (Early Exit, Late Exit)
+    if has_rmult_cols:
+        violations += _r_multiple_violations(
+            entry,
+            _float_column(trades, "exit_price"),
+            stop,
+            _side_upper(trades),
+            trades.index
+        )
+
+    return violations
@@ -1,21 +1,22 @@
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from dataclasses import dataclass, fields, is_dataclass
+from typing import List, Dict, Any, Optional
 
-@dataclass
+@dataclass(slots=True)
 class Violation:
     trade_index: int
     violation_type: str
     detail: str
 
-@dataclass
+@dataclass(slots=True)
 class DisciplineReport:
     compliance_score: float
     violations: List[Violation]
     regime_mismatch_rate: float
     violation_summary: Dict[str, int]
-    compliance_trend: str
+    compliance_trend: Optional[str] = None  # Set by ExecutionDisciplineAgent.record()
 
 def to_dict(obj):
-    if hasattr(obj, "__dict__"):
-        return obj.__dict__
+    # Slotted dataclasses have no __dict__, so read the declared fields (shallow, unlike asdict)
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
     return obj